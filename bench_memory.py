@@ -0,0 +1,161 @@
+"""בנצ'מרק זיכרון — פיפליין dict (לפני) מול Message (אחרי), ל-10k הודעות.
+
+כל וריאנט רץ בתהליך נפרד כדי ש-peak RSS (ru_maxrss) יהיה נקי.
+מודד:
+  - peak RSS של התהליך
+  - peak traced (tracemalloc) לאורך parse → filter → format
+  - זיכרון ובלוקים שנשארים מוחזקים ע"י רשימת ההודעות
+
+שימוש:
+    python bench_memory.py [N]
+"""
+import gc
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+N_DEFAULT = 10_000
+
+_WIDGET = (
+    '<div class="tgme_widget_message" data-post="PikudHaOref_all/{id}">'
+    '<div class="tgme_widget_message_text">{text}</div>'
+    '<a class="tgme_widget_message_date" href="https://t.me/PikudHaOref_all/{id}">'
+    '<time datetime="2026-02-28T14:30:00+02:00">14:30</time></a></div>\n'
+)
+_TEXTS = [
+    "תושבי תל אביב — ניתן לצאת מהמרחב המוגן",
+    "ירי רקטות לעבר אשדוד — היכנסו למרחב מוגן",
+    "עדכון שגרתי מפיקוד העורף",
+]
+
+
+def _make_html(n: int) -> str:
+    return "".join(
+        _WIDGET.format(id=100_000 + i, text=_TEXTS[i % len(_TEXTS)]) for i in range(n)
+    )
+
+
+# ── לפני: העתק של הפיפליין המקורי (dict-ים, lower בכל בדיקה, שרשור content) ──
+
+def _legacy_parse(html: str) -> list[dict]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    messages = []
+    for widget in soup.select(".tgme_widget_message"):
+        data_post = widget.get("data-post", "")
+        msg_id = data_post.split("/")[-1] if "/" in data_post else None
+        if not msg_id:
+            link = widget.select_one("a.tgme_widget_message_date")
+            match = re.search(r'/(\d+)$', link["href"]) if link else None
+            msg_id = match.group(1) if match else None
+        if not msg_id:
+            continue
+        text_el = widget.select_one(".tgme_widget_message_text")
+        text = text_el.get_text(separator="\n", strip=True) if text_el else ""
+        if not text:
+            continue
+        time_el = widget.select_one("time[datetime]")
+        messages.append({
+            "id": msg_id,
+            "text": text,
+            "date": time_el["datetime"] if time_el else "",
+        })
+    return messages
+
+
+def _legacy_run(html: str) -> list:
+    import monitor
+    messages = _legacy_parse(html)
+    for msg in messages:
+        text = msg["text"]
+        text_lower = text.lower()
+        if not any(c.lower() in text_lower for c in monitor.ALERT_CITIES):
+            continue
+        if not any(p in text for p in monitor.POSITIVE_PHRASES):
+            continue
+        content = msg["text"]
+        if msg["date"]:
+            content += f"\n\n🕐 {msg['date']}"
+        _ = (
+            "🔔 התראת פיקוד העורף\n"
+            "━━━━━━━━━━━━━━━━━━━━\n"
+            f"{content}\n"
+            "━━━━━━━━━━━━━━━━━━━━"
+        )
+    return messages
+
+
+# ── אחרי: הפיפליין הנוכחי ──
+
+def _current_run(html: str) -> list:
+    from monitor import matches_filter
+    from notifier import format_alert
+    from scraper import _parse_messages
+    messages = list(_parse_messages(html))
+    for msg in messages:
+        match, _ = matches_filter(msg)
+        if match:
+            format_alert(msg)
+    return messages
+
+
+_VARIANTS = {"before": _legacy_run, "after": _current_run}
+
+
+def _measure(variant: str, n: int) -> dict:
+    import monitor  # noqa: F401 — import מחוץ למדידה
+    import notifier  # noqa: F401
+    import scraper  # noqa: F401
+    html = _make_html(n)
+
+    tracemalloc.start()
+    messages = _VARIANTS[variant](html)
+    _, peak = tracemalloc.get_traced_memory()
+    # מה שנשאר מוחזק ע"י הרשומות עצמן — ה-soup מלא cycles, משחררים לפני המדידה
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    retained = sum(s.size for s in stats)
+    blocks = sum(s.count for s in stats)
+    del messages
+
+    return {
+        "variant": variant,
+        "n": n,
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_traced_kib": peak / 1024,
+        "retained_kib": retained / 1024,
+        "retained_blocks": blocks,
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_DEFAULT
+    results = []
+    for variant in _VARIANTS:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", variant, str(n)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{'variant':<8} {'peak RSS':>12} {'peak traced':>14} {'retained':>12} {'blocks':>9}  (N={n})")
+    for r in results:
+        print(
+            f"{r['variant']:<8} {r['peak_rss_kib']:>9} KiB {r['peak_traced_kib']:>10.0f} KiB "
+            f"{r['retained_kib']:>8.0f} KiB {r['retained_blocks']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        print(json.dumps(_measure(sys.argv[2], int(sys.argv[3]))))
+    else:
+        main()
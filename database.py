@@ -1,4 +1,8 @@
-"""שכבת נתונים — SQLite עם thread-local connections.
+"""שכבת נתונים — SQLite עם pool חסום של connections.
+
+ה-pool משותף לכל ה-threads (asyncio.to_thread יכול לרוץ על הרבה threads
+שונים של ה-executor) — מספר ה-connections הפתוחים לא עולה על DB_POOL_SIZE,
+ו-close_db() סוגר את כולם בכיבוי.
 
 טבלאות:
   seen_messages — מעקב אחרי הודעות שכבר עובדו (dedup)
@@ -6,6 +10,8 @@
 """
 import sqlite3
 import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
@@ -17,15 +23,100 @@ log = get_logger("DB")
 
 _TZ = ZoneInfo(os.environ.get("TIMEZONE", "Asia/Jerusalem"))
 DB_PATH = Path(__file__).resolve().parent / "data" / "alerts.db"
-_local = threading.local()
-
-
-def _get_conn() -> sqlite3.Connection:
-    if not hasattr(_local, "conn"):
+# מקסימום connections פתוחים בו-זמנית
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+# כמה זמן לחכות ל-connection פנוי לפני שמוותרים
+_ACQUIRE_TIMEOUT = 30
+
+
+class _ConnectionPool:
+    """pool חסום — connections נוצרים לפי דרישה עד size, ומוחזרים אחרי כל שימוש.
+
+    ה-limit כולל גם connections שנסגרים (היו בשימוש בזמן close_all) — עד
+    שהם מוחזרים ונסגרים בפועל הם עדיין תופסים מקום.
+    """
+
+    def __init__(self, size: int):
+        self._size = max(1, size)
+        self._idle: list[sqlite3.Connection] = []
+        self._all: set[sqlite3.Connection] = set()
+        # connections שהיו בשימוש כשה-pool נסגר — פתוחים עד שיוחזרו
+        self._closing: set[sqlite3.Connection] = set()
+        # מעיר ממתינים בכל פעם שמתפנה connection או מקום ליצירה
+        self._cond = threading.Condition()
+
+    @property
+    def open_count(self) -> int:
+        with self._cond:
+            return len(self._all) + len(self._closing)
+
+    def _connect(self) -> sqlite3.Connection:
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        _local.conn = sqlite3.connect(str(DB_PATH))
-        _local.conn.execute("PRAGMA journal_mode=WAL")
-    return _local.conn
+        # check_same_thread=False — connection עובר בין threads, אבל אף פעם לא בו-זמנית
+        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + _ACQUIRE_TIMEOUT
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._all) + len(self._closing) < self._size:
+                    conn = self._connect()
+                    self._all.add(conn)
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"אין connection פנוי ב-pool אחרי {_ACQUIRE_TIMEOUT} שניות"
+                    )
+                self._cond.wait(remaining)
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            if conn in self._all:
+                self._idle.append(conn)
+            else:
+                # ה-pool נסגר בזמן שה-connection היה בשימוש
+                self._closing.discard(conn)
+                conn.close()
+            self._cond.notify()
+
+    def close_all(self):
+        """סוגר את כל ה-connections הפנויים; אלה שבשימוש ייסגרו כשיוחזרו."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._closing |= self._all.difference(idle)
+            self._all = set()
+            for conn in idle:
+                conn.close()
+            self._cond.notify_all()
+
+
+_pool = _ConnectionPool(DB_POOL_SIZE)
+
+
+@contextmanager
+def _connection():
+    conn = _pool.acquire()
+    try:
+        yield conn
+    finally:
+        _pool.release(conn)
+
+
+def open_connections() -> int:
+    """מספר ה-connections הפתוחים כרגע ב-pool."""
+    return _pool.open_count
+
+
+def close_db():
+    """סוגר את כל ה-connections — לקריאה בכיבוי (או כשמחליפים DB_PATH)."""
+    _pool.close_all()
 
 
 def _now_str() -> str:
@@ -33,17 +124,19 @@ def _now_str() -> str:
 
 
 def init_db():
-    with _get_conn() as conn:
+    # msg_id INTEGER PRIMARY KEY = alias ל-rowid (בלי אינדקס נפרד).
+    # DB ישן עם עמודת TEXT ממשיך לעבוד — SQLite ממיר את ה-int לפי ה-affinity.
+    with _connection() as conn, conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS seen_messages (
-                msg_id TEXT PRIMARY KEY,
+                msg_id INTEGER PRIMARY KEY,
                 channel TEXT NOT NULL,
                 seen_at TEXT NOT NULL
             )
         """)
         conn.execute("""
             CREATE TABLE IF NOT EXISTS sent_alerts (
-                msg_id TEXT PRIMARY KEY,
+                msg_id INTEGER PRIMARY KEY,
                 channel TEXT NOT NULL,
                 content TEXT NOT NULL,
                 sent_at TEXT NOT NULL
@@ -52,41 +145,43 @@ def init_db():
     log.info("DB מאותחל")
 
 
-def is_seen(msg_id: str) -> bool:
-    row = _get_conn().execute(
-        "SELECT 1 FROM seen_messages WHERE msg_id = ?", (msg_id,)
-    ).fetchone()
+def is_seen(msg_id: int) -> bool:
+    with _connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM seen_messages WHERE msg_id = ?", (msg_id,)
+        ).fetchone()
     return row is not None
 
 
-def mark_seen(msg_id: str, channel: str):
-    with _get_conn() as conn:
+def mark_seen(msg_id: int, channel: str):
+    with _connection() as conn, conn:
         conn.execute(
             "INSERT OR IGNORE INTO seen_messages (msg_id, channel, seen_at) VALUES (?, ?, ?)",
             (msg_id, channel, _now_str()),
         )
 
 
-def is_alert_sent(msg_id: str) -> bool:
-    row = _get_conn().execute(
-        "SELECT 1 FROM sent_alerts WHERE msg_id = ?", (msg_id,)
-    ).fetchone()
+def is_alert_sent(msg_id: int) -> bool:
+    with _connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM sent_alerts WHERE msg_id = ?", (msg_id,)
+        ).fetchone()
     return row is not None
 
 
-def save_alert(msg_id: str, channel: str, content: str):
-    with _get_conn() as conn:
+def save_alert(msg_id: int, channel: str, content: str):
+    with _connection() as conn, conn:
         conn.execute(
             "INSERT OR IGNORE INTO sent_alerts (msg_id, channel, content, sent_at) VALUES (?, ?, ?, ?)",
             (msg_id, channel, content, _now_str()),
         )
 
 
-def cleanup_old(days: int = 14):
+def cleanup_old(days: float = 14):
     """מוחק רשומות ישנות מ-seen_messages — מונע גדילת DB אינסופית."""
     from datetime import timedelta
     cutoff = (datetime.now(_TZ) - timedelta(days=days)).isoformat()
-    with _get_conn() as conn:
+    with _connection() as conn, conn:
         deleted = conn.execute(
             "DELETE FROM seen_messages WHERE seen_at < ?", (cutoff,)
         ).rowcount
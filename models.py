@@ -0,0 +1,34 @@
+"""רשומת הודעה — immutable, slotted, עוברת כמו שהיא לאורך כל הפיפליין.
+
+scraper → matches_filter → database → notifier, בלי dict-ים ובלי העתקות טקסט.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, tzinfo
+
+# fromisoformat יוצר אובייקט timezone חדש לכל קריאה — משתפים אחד לכל offset
+_TZ_CACHE: dict[tzinfo, tzinfo] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class Message:
+    id: int
+    text: str
+    date: datetime | None = None
+    # טקסט מנורמל (lowercase) — מחושב פעם אחת ביצירה, לא בכל בדיקת פילטר
+    text_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        lowered = self.text.lower()
+        # עברית לא משתנה ב-lower — שומרים הפניה לאותו str במקום עותק
+        object.__setattr__(self, "text_lower", self.text if lowered == self.text else lowered)
+
+    @classmethod
+    def from_raw(cls, msg_id: int, text: str, date_str: str = "") -> "Message":
+        """בונה רשומה מערכים גולמיים מה-HTML. תאריך לא תקין → None."""
+        try:
+            date = datetime.fromisoformat(date_str) if date_str else None
+        except ValueError:
+            date = None
+        if date is not None and date.tzinfo is not None:
+            date = date.replace(tzinfo=_TZ_CACHE.setdefault(date.tzinfo, date.tzinfo))
+        return cls(msg_id, text, date)
@@ -14,9 +14,11 @@ import threading
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from database import init_db, is_seen, mark_seen, is_alert_sent, save_alert, cleanup_old
+from database import init_db, is_seen, mark_seen, is_alert_sent, save_alert, cleanup_old, close_db
 from logger import get_logger
+from models import Message
 from notifier import send_alert, send_message
+from profiler import profiler, setup as setup_profiler
 from scraper import fetch_latest_messages
 
 log = get_logger("Monitor")
@@ -26,6 +28,10 @@ log = get_logger("Monitor")
 # מרווח סריקה — כל 45 שניות (ברירת מחדל)
 POLL_INTERVAL = int(os.environ.get("POLL_INTERVAL", "45"))
 
+# ניקוי DB — כל 6 שעות, מוחק seen_messages ישנים מ-CLEANUP_DAYS ימים
+CLEANUP_INTERVAL = 6 * 3600
+CLEANUP_DAYS = 14
+
 # אזור זמן
 _TZ = ZoneInfo(os.environ.get("TIMEZONE", "Asia/Jerusalem"))
 
@@ -58,9 +64,10 @@ NEGATIVE_PHRASES: list[str] = [
 ]
 
 
-def matches_filter(text: str) -> tuple[bool, str]:
+def matches_filter(msg: Message | str) -> tuple[bool, str]:
     """בודק אם ההודעה עוברת את הפילטר — whitelist בלבד.
 
+    מקבל Message (משתמש ב-text_lower השמור) או טקסט גולמי.
     מחזיר (True, סיבה) אם עוברת, (False, "") אם לא.
 
     לוגיקה:
@@ -68,7 +75,10 @@ def matches_filter(text: str) -> tuple[bool, str]:
       2. חייב להכיל ביטוי חיובי (ניתן לצאת...)
       3. לא יכול להכיל ביטוי שלילי (אין לצאת...)
     """
-    text_lower = text.lower()
+    if isinstance(msg, Message):
+        text, text_lower = msg.text, msg.text_lower
+    else:
+        text, text_lower = msg, msg.lower()
 
     # בדיקת עיר — חייב לפחות אחת
     matched_city = None
@@ -108,28 +118,22 @@ async def run_cycle():
     alert_count = 0
 
     for msg in messages:
-        msg_id = msg["id"]
-
-        if is_seen(msg_id):
+        if is_seen(msg.id):
             continue
 
-        mark_seen(msg_id, "PikudHaOref_all")
+        mark_seen(msg.id, "PikudHaOref_all")
         new_count += 1
 
-        match, reason = matches_filter(msg["text"])
+        match, reason = matches_filter(msg)
         if match:
-            if is_alert_sent(msg_id):
-                log.debug(f"הודעה {msg_id} כבר נשלחה")
+            if is_alert_sent(msg.id):
+                log.debug(f"הודעה {msg.id} כבר נשלחה")
                 continue
 
-            log.info(f"🔔 התראה! {reason} | msg_id={msg_id}")
-            content = msg["text"]
-            if msg["date"]:
-                content += f"\n\n🕐 {msg['date']}"
-
-            success = await asyncio.to_thread(send_alert, content)
+            log.info(f"🔔 התראה! {reason} | msg_id={msg.id}")
+            success = await asyncio.to_thread(send_alert, msg)
             if success:
-                save_alert(msg_id, "PikudHaOref_all", msg["text"])
+                save_alert(msg.id, "PikudHaOref_all", msg.text)
                 alert_count += 1
 
     if new_count:
@@ -139,6 +143,7 @@ async def run_cycle():
 async def main():
     """לולאה ראשית — סריקה כל POLL_INTERVAL שניות."""
     init_db()
+    setup_profiler()
 
     log.info(f"מתחיל ניטור פיקוד העורף | poll={POLL_INTERVAL}s")
     log.info(f"ערים: {ALERT_CITIES}")
@@ -152,25 +157,30 @@ async def main():
     )
     await asyncio.to_thread(send_message, startup_msg)
 
-    # ניקוי ישן כל 6 שעות
+    # ניקוי ישן כל CLEANUP_INTERVAL
     cleanup_counter = 0
-    cleanup_every = (6 * 3600) // POLL_INTERVAL  # כל כמה סבבים לנקות
+    cleanup_every = max(1, int(CLEANUP_INTERVAL // POLL_INTERVAL))  # כל כמה סבבים לנקות
 
-    while True:
-        try:
-            await run_cycle()
-        except Exception as e:
-            log.error(f"שגיאה במחזור סריקה: {e}")
-
-        cleanup_counter += 1
-        if cleanup_counter >= cleanup_every:
-            cleanup_counter = 0
+    try:
+        while True:
+            profiler.before_cycle()
             try:
-                await asyncio.to_thread(cleanup_old, 14)
+                await run_cycle()
             except Exception as e:
-                log.error(f"שגיאה בניקוי DB: {e}")
-
-        await asyncio.sleep(POLL_INTERVAL)
+                log.error(f"שגיאה במחזור סריקה: {e}")
+            profiler.after_cycle()
+
+            cleanup_counter += 1
+            if cleanup_counter >= cleanup_every:
+                cleanup_counter = 0
+                try:
+                    await asyncio.to_thread(cleanup_old, CLEANUP_DAYS)
+                except Exception as e:
+                    log.error(f"שגיאה בניקוי DB: {e}")
+
+            await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        close_db()
 
 
 if __name__ == "__main__":
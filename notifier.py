@@ -4,6 +4,7 @@ import os
 import requests
 
 from logger import get_logger
+from models import Message
 
 log = get_logger("Notifier")
 
@@ -40,12 +41,17 @@ def send_message(text: str, *, chat_id: str | None = None) -> bool:
         return False
 
 
-def send_alert(content: str, *, chat_id: str | None = None) -> bool:
-    """שולח התראת פיקוד העורף מפורמטת."""
-    text = (
+def format_alert(msg: Message) -> str:
+    """בונה את טקסט ההתראה בהקצאה אחת — בלי שרשור ביניים של content."""
+    date_line = f"\n\n🕐 {msg.date.isoformat()}" if msg.date else ""
+    return (
         "🔔 התראת פיקוד העורף\n"
         "━━━━━━━━━━━━━━━━━━━━\n"
-        f"{content}\n"
+        f"{msg.text}{date_line}\n"
         "━━━━━━━━━━━━━━━━━━━━"
     )
-    return send_message(text, chat_id=chat_id)
+
+
+def send_alert(msg: Message, *, chat_id: str | None = None) -> bool:
+    """שולח התראת פיקוד העורף מפורמטת."""
+    return send_message(format_alert(msg), chat_id=chat_id)
@@ -0,0 +1,241 @@
+"""פרופיילר דגימה + tracemalloc ללולאת המוניטור.
+
+מופעל דרך env (PROFILE=1 — מתחיל מהסבב הראשון) או בזמן ריצה דרך SIGUSR1
+(toggle — שליחה נוספת עוצרת מוקדם). בלי צורך ב-restart.
+
+כל סשן רץ PROFILE_CYCLES סבבים ואז כותב ל-data/:
+  profile-<ts>-<pid>-<n>.collapsed — collapsed stacks (קלט ל-flamegraph.pl / speedscope)
+  alloc-<ts>-<pid>-<n>.txt         — top הקצאות + diff מול תחילת הסשן
+
+שגיאה בפרופיילר נרשמת ללוג ומאפסת אותו — אף פעם לא מפילה את לולאת ההתראות.
+
+כשכבוי — אין thread דגימה ואין tracemalloc; ה-hooks בלולאה הם בדיקת flag בלבד.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from logger import get_logger
+
+log = get_logger("Profiler")
+
+_TZ = ZoneInfo(os.environ.get("TIMEZONE", "Asia/Jerusalem"))
+PROFILE_DIR = Path(__file__).resolve().parent / "data"
+
+# הפעלה מה-env כבר בעלייה
+PROFILE_ON_START = os.environ.get("PROFILE", "") in ("1", "true", "yes")
+# כמה סבבים לפרופל בכל סשן
+PROFILE_CYCLES = int(os.environ.get("PROFILE_CYCLES", "10"))
+# מרווח דגימה במילישניות
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+# כמה שורות בדוח ההקצאות
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "25"))
+# עומק stack שנשמר לכל הקצאה
+_TRACEMALLOC_FRAMES = 10
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+def _collapse(frame) -> str:
+    """stack מה-root ל-leaf בפורמט collapsed (מופרד ב-;)."""
+    parts = []
+    while frame is not None:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+class _Sampler(threading.Thread):
+    """thread שדוגם את ה-stacks של כל ה-threads במרווח קבוע.
+
+    דוגם רק כש-active מסומן — כלומר בתוך סבב, לא בזמן ה-sleep בין סבבים.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self._interval = interval
+        self.active = threading.Event()
+        self._halt = threading.Event()
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+
+    def run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._halt.is_set():
+            if not self.active.wait(0.1):
+                continue
+            # stop() מסמן גם active כדי להעיר אותנו — לא דוגמים את העצירה עצמה
+            if self._halt.is_set():
+                break
+            for tid, frame in sys._current_frames().items():
+                if tid == own_id:
+                    continue
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                thread_name = names.get(tid, str(tid))
+                self.stacks[f"{thread_name};{_collapse(frame)}"] += 1
+            self.samples += 1
+            time.sleep(self._interval)
+
+    def stop(self):
+        self._halt.set()
+        self.active.set()
+        self.join(timeout=2)
+
+
+class Profiler:
+    """מנהל סשני פרופיילינג לפי סבבים.
+
+    שימוש בלולאה:
+        profiler.before_cycle()
+        await run_cycle()
+        profiler.after_cycle()
+    """
+
+    def __init__(self, cycles: int = PROFILE_CYCLES, out_dir: Path | None = None):
+        self._cycles = max(1, cycles)
+        self._out_dir = out_dir
+        self._toggle_requested = False
+        self._sampler: _Sampler | None = None
+        self._remaining = 0
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._started_tracemalloc = False
+        self._session = 0
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None
+
+    def request_toggle(self):
+        """מתחיל סשן אם כבוי, עוצר אם פעיל. בטוח לקריאה מ-signal handler —
+        רק מסמן flag, הפעולה עצמה קורית בגבול הסבב הבא."""
+        self._toggle_requested = True
+
+    def before_cycle(self):
+        try:
+            if self._toggle_requested:
+                self._toggle_requested = False
+                if self._sampler is None:
+                    self._start()
+                else:
+                    self._finish()
+                    return
+            if self._sampler is not None:
+                self._sampler.active.set()
+        except Exception as e:
+            self._abort(e)
+
+    def after_cycle(self):
+        if self._sampler is None:
+            return
+        try:
+            self._sampler.active.clear()
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self._finish()
+        except Exception as e:
+            self._abort(e)
+
+    def _abort(self, error: Exception):
+        """מאפס את כל המצב אחרי שגיאה — בלי לזרוק הלאה."""
+        log.error(f"שגיאה בפרופיילר, הסשן בוטל: {error}")
+        sampler = self._sampler
+        self._sampler = None
+        self._baseline = None
+        self._remaining = 0
+        try:
+            if sampler is not None:
+                sampler.stop()
+            if self._started_tracemalloc and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        except Exception as e:
+            log.error(f"שגיאה באיפוס הפרופיילר: {e}")
+        self._started_tracemalloc = False
+
+    def _start(self):
+        self._session += 1
+        self._remaining = self._cycles
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+        self._sampler = _Sampler(PROFILE_INTERVAL_MS / 1000)
+        self._sampler.start()
+        log.info(f"פרופיילינג התחיל | {self._cycles} סבבים, דגימה כל {PROFILE_INTERVAL_MS}ms")
+
+    def _finish(self):
+        sampler = self._sampler
+        self._sampler = None
+        sampler.stop()
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        baseline = self._baseline
+        self._baseline = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        try:
+            paths = self._write_reports(sampler, snapshot, baseline, current, peak)
+        except OSError as e:
+            log.error(f"שגיאה בכתיבת דוחות פרופיילינג: {e}")
+            return
+        log.info(f"פרופיילינג הסתיים | {sampler.samples} דגימות → {', '.join(p.name for p in paths)}")
+
+    def _write_reports(self, sampler: _Sampler, snapshot, baseline,
+                       current: int, peak: int) -> list[Path]:
+        out_dir = self._out_dir or PROFILE_DIR
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # pid + מונה סשן — שני סשנים שמסתיימים באותה שנייה לא דורסים זה את זה
+        ts = datetime.now(_TZ).strftime("%Y%m%d-%H%M%S")
+        name = f"{ts}-{os.getpid()}-{self._session}"
+
+        stacks_path = out_dir / f"profile-{name}.collapsed"
+        with stacks_path.open("w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        alloc_path = out_dir / f"alloc-{name}.txt"
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        snapshot = snapshot.filter_traces(filters)
+        with alloc_path.open("w", encoding="utf-8") as f:
+            f.write(f"# traced current: {current / 1024:.1f} KiB | peak: {peak / 1024:.1f} KiB\n")
+            f.write("\n## top allocations by line\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+                f.write(f"{stat}\n")
+            if baseline is not None:
+                baseline = baseline.filter_traces(filters)
+                f.write("\n## growth since session start\n")
+                for stat in snapshot.compare_to(baseline, "lineno")[:PROFILE_TOP]:
+                    f.write(f"{stat}\n")
+        return [stacks_path, alloc_path]
+
+
+profiler = Profiler()
+
+
+def setup():
+    """מפעיל סשן מה-env ומתקין SIGUSR1 → toggle (רק מה-main thread ורק בפלטפורמות שתומכות)."""
+    if PROFILE_ON_START:
+        profiler.request_toggle()
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    if threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGUSR1, lambda sig, frame: profiler.request_toggle())
@@ -4,11 +4,13 @@
 סורק את https://t.me/s/CHANNEL שמחזיר את ההודעות האחרונות כ-HTML.
 """
 import re
+from collections.abc import Iterator
 
 import requests
 from bs4 import BeautifulSoup
 
 from logger import get_logger
+from models import Message
 
 log = get_logger("Scraper")
 
@@ -27,13 +29,12 @@ _HEADERS = {
 }
 
 
-def fetch_latest_messages(channel: str = DEFAULT_CHANNEL) -> list[dict]:
+def fetch_latest_messages(channel: str = DEFAULT_CHANNEL) -> list[Message]:
     """מביא את ההודעות האחרונות מערוץ טלגרם ציבורי.
 
-    מחזיר רשימת dict עם:
-      - id: מזהה ההודעה (str)
-      - text: תוכן ההודעה
-      - date: תאריך (str, אם קיים)
+    מחזיר רשימת Message. הרשימה נבנית כאן (ולא generator) כי הפונקציה
+    רצה ב-to_thread — הפירוש של BeautifulSoup צריך לקרות ב-thread הזה,
+    לא בלולאת ה-asyncio.
     """
     url = CHANNEL_URL_TEMPLATE.format(channel=channel)
     try:
@@ -43,18 +44,19 @@ def fetch_latest_messages(channel: str = DEFAULT_CHANNEL) -> list[dict]:
         log.error(f"שגיאה בטעינת ערוץ {channel}: {e}")
         return []
 
-    return _parse_messages(resp.text)
+    messages = list(_parse_messages(resp.text))
+    log.debug(f"חולצו {len(messages)} הודעות")
+    return messages
 
 
-def _parse_messages(html: str) -> list[dict]:
-    """מפרש HTML של t.me/s/channel ומחלץ הודעות."""
+def _parse_messages(html: str) -> Iterator[Message]:
+    """מפרש HTML של t.me/s/channel ומחלץ הודעות (lazy)."""
     soup = BeautifulSoup(html, "html.parser")
-    messages = []
 
     # כל הודעה ב-t.me/s/ עטופה ב-div.tgme_widget_message
     for widget in soup.select(".tgme_widget_message"):
         msg_id = _extract_msg_id(widget)
-        if not msg_id:
+        if msg_id is None:
             continue
 
         # תוכן ההודעה
@@ -67,28 +69,24 @@ def _parse_messages(html: str) -> list[dict]:
         time_el = widget.select_one("time[datetime]")
         date_str = time_el["datetime"] if time_el else ""
 
-        messages.append({
-            "id": msg_id,
-            "text": text,
-            "date": date_str,
-        })
-
-    log.debug(f"חולצו {len(messages)} הודעות")
-    return messages
+        yield Message.from_raw(msg_id, text, date_str)
 
 
-def _extract_msg_id(widget) -> str | None:
+def _extract_msg_id(widget) -> int | None:
     """מחלץ message ID מ-data-post attribute."""
     # data-post="PikudHaOref_all/12345"
     data_post = widget.get("data-post", "")
     if "/" in data_post:
-        return data_post.split("/")[-1]
+        # ספרות ASCII בלבד — isdigit מקבל גם תווים כמו ² ש-int() דוחה
+        match = re.fullmatch(r"\d+", data_post.rsplit("/", 1)[-1], re.ASCII)
+        if match:
+            return int(match.group(0))
 
     # fallback — href בלינק
     link = widget.select_one("a.tgme_widget_message_date")
     if link and link.get("href"):
-        match = re.search(r'/(\d+)$', link["href"])
+        match = re.search(r'/(\d+)$', link["href"], re.ASCII)
         if match:
-            return match.group(1)
+            return int(match.group(1))
 
     return None
@@ -0,0 +1,269 @@
+"""Soak test — מריץ את monitor.main מול שרתים מקומיים לאורך "ימים" מדומים.
+
+שרת HTTP מקומי אחד משמש גם כ-t.me/s/ (GET — עמוד עם הודעות חדשות בכל
+בקשה) וגם כ-Telegram Bot API (POST sendMessage). מרווח הסריקה מכווץ, כך
+שיום מדומה = 86400 / 45 סבבים.
+
+גם ה-retention של cleanup_old מכווץ לאותו שעון מדומה, כך ש-seen_messages
+מגיע למצב יציב (נמחק בקצב שהוא מתמלא) כבר בתוך הריצה.
+
+לאורך הריצה נדגמים RSS, FDs פתוחים, connections של SQLite, threads,
+שורות ב-seen_messages וגודל קבצי ה-DB (כולל WAL).
+לכל מדד מחושב שיפוע (least squares) ליום מדומה אחרי ה-warmup, ומוקרן על
+--horizon-days (ברירת מחדל 30 — "שבועות של uptime"). גדילה מוקרנת מעבר
+לתקציב = כישלון (exit code 1). seen_messages וגודל ה-DB עולים ויורדים בין
+ניקויים, ולכן עבורם משווים את השיא בחצי השני של הריצה לשיא בחצי הראשון.
+
+sent_alerts הוא היסטוריה ולא מתנקה בכוונה — לכן השרת מחזיר הודעה שעוברת
+את הפילטר רק פעם ב-_ALERT_EVERY הודעות.
+
+שימוש:
+    python soak.py [--days 4] [--interval 0.005] [--retention-days 0.5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "soak")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+import database
+import monitor
+import notifier
+import scraper
+
+# מרווח הסריקה האמיתי — לפיו מחושב כמה סבבים הם "יום"
+_PROD_INTERVAL = 45
+_PAGE_SIZE = 20
+_NEW_PER_PAGE = 3
+# הודעה אחת מכל כמה עוברת את הפילטר (ונשמרת ב-sent_alerts)
+_ALERT_EVERY = 200
+_ALERT_TEXT = "תושבי תל אביב — ניתן לצאת מהמרחב המוגן"
+_TEXTS = [
+    "ירי רקטות לעבר אשדוד — היכנסו למרחב מוגן",
+    "עדכון שגרתי מפיקוד העורף",
+]
+
+
+def _text(msg_id: int) -> str:
+    return _ALERT_TEXT if msg_id % _ALERT_EVERY == 0 else _TEXTS[msg_id % len(_TEXTS)]
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    last_id = 1000
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with _StandIn.lock:
+            _StandIn.last_id += _NEW_PER_PAGE
+            last = _StandIn.last_id
+        body = "".join(
+            f'<div class="tgme_widget_message" data-post="soak/{i}">'
+            f'<div class="tgme_widget_message_text">{_text(i)} #{i}</div>'
+            f'<a class="tgme_widget_message_date" href="https://t.me/soak/{i}">'
+            f'<time datetime="2026-02-28T14:30:00+02:00">14:30</time></a></div>'
+            for i in range(last - _PAGE_SIZE + 1, last + 1)
+        ).encode()
+        self._reply(body, "text/html; charset=utf-8")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(b'{"ok":true}', "application/json")
+
+    def _reply(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _rss_kib() -> int:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _fds() -> tuple[int, int]:
+    """(כל ה-FDs, FDs שמצביעים על קבצי ה-DB — כולל wal/shm)."""
+    total = db_files = 0
+    db_name = database.DB_PATH.name
+    for fd in os.listdir("/proc/self/fd"):
+        total += 1
+        try:
+            if Path(os.readlink(f"/proc/self/fd/{fd}")).name.startswith(db_name):
+                db_files += 1
+        except OSError:
+            pass
+    return total, db_files
+
+
+def _db_kib() -> int:
+    """גודל קובץ ה-DB + WAL."""
+    total = 0
+    for suffix in ("", "-wal"):
+        try:
+            total += os.path.getsize(f"{database.DB_PATH}{suffix}")
+        except OSError:
+            pass
+    return total // 1024
+
+
+def _seen_rows() -> int:
+    with database._connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM seen_messages").fetchone()[0]
+
+
+def _sample(cycle: int) -> dict:
+    fds, db_fds = _fds()
+    return {
+        "cycle": cycle,
+        "rss_kib": _rss_kib(),
+        "fds": fds,
+        "db_fds": db_fds,
+        "sqlite_conns": database.open_connections(),
+        "threads": threading.active_count(),
+        "seen_rows": _seen_rows(),
+        "db_kib": _db_kib(),
+    }
+
+
+async def _soak(total_cycles: int, sample_every: int, retention_days: float) -> list[dict]:
+    samples = []
+    done = asyncio.Event()
+    cycles = 0
+    run_cycle = monitor.run_cycle
+    started = time.monotonic()
+
+    async def counted_cycle():
+        nonlocal cycles
+        await run_cycle()
+        cycles += 1
+        # cleanup_old עובד לפי שעון אמיתי — ממירים את ה-retention המדומה לפי
+        # הזמן האמיתי שלוקח סבב (כולל העבודה עצמה, לא רק ה-sleep)
+        real_per_cycle = (time.monotonic() - started) / cycles
+        monitor.CLEANUP_DAYS = retention_days * real_per_cycle / _PROD_INTERVAL
+        if cycles % sample_every == 0:
+            samples.append(_sample(cycles))
+            day = cycles * _PROD_INTERVAL / 86400
+            print(f"  day {day:5.2f} | {samples[-1]}", flush=True)
+        if cycles >= total_cycles:
+            done.set()
+
+    monitor.run_cycle = counted_cycle
+    task = asyncio.create_task(monitor.main())
+    try:
+        await done.wait()
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        monitor.run_cycle = run_cycle
+    return samples
+
+
+def _check(samples: list[dict], warmup_cycles: int, horizon_days: float,
+           rss_budget_mib: float) -> list[str]:
+    """שיפוע ליום מדומה לכל מדד, מוקרן על horizon_days, מול תקציב גדילה."""
+    body = [s for s in samples if s["cycle"] > warmup_cycles]
+    if len(body) < 3:
+        return [f"רק {len(body)} דגימות אחרי warmup — הגדל --days או --samples"]
+    days = [s["cycle"] * _PROD_INTERVAL / 86400 for s in body]
+    # גדילה מותרת לאורך כל ה-horizon
+    budgets = {
+        "rss_kib": rss_budget_mib * 1024,
+        "fds": 1,
+        "db_fds": 0.5,
+        "sqlite_conns": 0.5,
+        "threads": 1,
+    }
+    failures = []
+    for key, budget in budgets.items():
+        slope = statistics.linear_regression(days, [s[key] for s in body]).slope
+        projected = slope * horizon_days
+        status = "OK" if projected <= budget else "FAIL"
+        print(f"  {key:<13} {slope:>+10.2f}/day → {projected:>+10.1f} in {horizon_days:g}d"
+              f"  (budget +{budget:g})  {status}")
+        if status == "FAIL":
+            failures.append(key)
+    # seen_messages וה-DB עולים ויורדים בשן מסור בין ניקויים — משווים שיאים
+    half = len(body) // 2
+    for key, tolerance in (("seen_rows", 0.05), ("db_kib", 0.05)):
+        start = max(s[key] for s in body[:half])
+        end = max(s[key] for s in body[half:])
+        limit = start * tolerance
+        status = "OK" if end - start <= limit else "FAIL"
+        print(f"  {key:<13} {start:>10.0f} → {end:>10.0f}  (peak, limit +{limit:.0f})  {status}")
+        if status == "FAIL":
+            failures.append(key)
+    peak_conns = max(s["sqlite_conns"] for s in samples)
+    if peak_conns > database.DB_POOL_SIZE:
+        failures.append(f"sqlite_conns peak {peak_conns} > pool {database.DB_POOL_SIZE}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=4, help="ימים מדומים")
+    parser.add_argument("--interval", type=float, default=0.005, help="מרווח סריקה מכווץ (שניות)")
+    parser.add_argument("--samples", type=int, default=200, help="כמה דגימות לאורך הריצה")
+    parser.add_argument("--retention-days", type=float, default=0.5,
+                        help="retention מדומה של seen_messages")
+    parser.add_argument("--horizon-days", type=float, default=30,
+                        help="על כמה ימים להקרין את השיפוע")
+    parser.add_argument("--rss-budget-mib", type=float, default=16,
+                        help="גדילת RSS מותרת לאורך כל ה-horizon")
+    args = parser.parse_args()
+
+    total_cycles = max(1, int(args.days * 86400 / _PROD_INTERVAL))
+    sample_every = max(1, total_cycles // args.samples)
+    # warmup = עד ש-seen_messages מגיע למצב יציב: retention + שני סבבי ניקוי
+    warmup_days = args.retention_days + 2 * monitor.CLEANUP_INTERVAL / 86400
+    if args.days < 2 * warmup_days:
+        parser.error(f"--days חייב להיות לפחות {2 * warmup_days:g} (פי 2 מה-warmup)")
+    warmup_cycles = int(warmup_days * 86400 / _PROD_INTERVAL)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="soak-server", daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = Path(tmp) / "soak.db"
+        scraper.CHANNEL_URL_TEMPLATE = base + "/s/{channel}"
+        notifier._API = f"{base}/bot{notifier.BOT_TOKEN}"
+        monitor.POLL_INTERVAL = args.interval
+        # ניקוי DB באותו קצב מדומה כמו בפרודקשן
+        monitor.CLEANUP_INTERVAL = monitor.CLEANUP_INTERVAL * args.interval / _PROD_INTERVAL
+
+        print(f"soak: {args.days} ימים מדומים = {total_cycles} סבבים, poll={args.interval}s")
+        samples = asyncio.run(_soak(total_cycles, sample_every, args.retention_days))
+        server.shutdown()
+
+        print("\nתוצאות:")
+        failures = _check(samples, warmup_cycles, args.horizon_days, args.rss_budget_mib)
+        leftover = database.open_connections()
+        if leftover:
+            failures.append(f"{leftover} connections נשארו פתוחים אחרי כיבוי")
+
+    if failures:
+        print(f"\nFAIL: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nOK — אין גדילה לא חסומה")
+
+
+if __name__ == "__main__":
+    main()
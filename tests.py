@@ -1,5 +1,6 @@
 """טסטים למוניטור פיקוד העורף."""
 import os
+import sqlite3
 import sys
 import pytest
 
@@ -9,6 +10,8 @@ os.environ.setdefault("TELEGRAM_CHAT_ID", "123456")
 
 from monitor import matches_filter, ALERT_CITIES, POSITIVE_PHRASES
 from scraper import _parse_messages, _extract_msg_id
+from models import Message
+from notifier import format_alert
 from database import init_db, is_seen, mark_seen, is_alert_sent, save_alert, cleanup_old, DB_PATH
 
 
@@ -107,30 +110,30 @@ _MSG_NO_TEXT_HTML = """
 
 class TestParseMessages:
     def test_parse_two_messages(self):
-        msgs = _parse_messages(_SAMPLE_HTML)
+        msgs = list(_parse_messages(_SAMPLE_HTML))
         assert len(msgs) == 2
 
     def test_message_id_extracted(self):
-        msgs = _parse_messages(_SAMPLE_HTML)
-        assert msgs[0]["id"] == "12345"
-        assert msgs[1]["id"] == "12344"
+        msgs = list(_parse_messages(_SAMPLE_HTML))
+        assert msgs[0].id == 12345
+        assert msgs[1].id == 12344
 
     def test_message_text(self):
-        msgs = _parse_messages(_SAMPLE_HTML)
-        assert "תל אביב" in msgs[0]["text"]
-        assert "אשדוד" in msgs[1]["text"]
+        msgs = list(_parse_messages(_SAMPLE_HTML))
+        assert "תל אביב" in msgs[0].text
+        assert "אשדוד" in msgs[1].text
 
     def test_message_date(self):
-        msgs = _parse_messages(_SAMPLE_HTML)
-        assert "2026-02-28" in msgs[0]["date"]
+        msgs = list(_parse_messages(_SAMPLE_HTML))
+        assert msgs[0].date.isoformat() == "2026-02-28T14:30:00+02:00"
 
     def test_empty_html(self):
-        msgs = _parse_messages("")
+        msgs = list(_parse_messages(""))
         assert msgs == []
 
     def test_no_text_skipped(self):
         """הודעה ללא טקסט (תמונה בלבד) — מדלגים."""
-        msgs = _parse_messages(_MSG_NO_TEXT_HTML)
+        msgs = list(_parse_messages(_MSG_NO_TEXT_HTML))
         assert msgs == []
 
     def test_fallback_id_from_link(self):
@@ -143,9 +146,67 @@ class TestParseMessages:
           </a>
         </div>
         """
-        msgs = _parse_messages(html)
+        msgs = list(_parse_messages(html))
         assert len(msgs) == 1
-        assert msgs[0]["id"] == "77777"
+        assert msgs[0].id == 77777
+
+    def test_non_numeric_post_id_skipped(self):
+        """data-post עם מזהה לא מספרי וללא לינק — מדלגים במקום לקרוס."""
+        html = """
+        <div class="tgme_widget_message" data-post="PikudHaOref_all/abc">
+          <div class="tgme_widget_message_text">test</div>
+        </div>
+        """
+        assert list(_parse_messages(html)) == []
+
+    def test_unicode_digit_post_id_falls_back_to_link(self):
+        """ספרות Unicode ב-data-post (12²) — לא קורס, נופל ל-href."""
+        html = """
+        <div class="tgme_widget_message" data-post="PikudHaOref_all/12²">
+          <div class="tgme_widget_message_text">test</div>
+          <a class="tgme_widget_message_date" href="https://t.me/PikudHaOref_all/88888"></a>
+        </div>
+        <div class="tgme_widget_message" data-post="PikudHaOref_all/٣٤">
+          <div class="tgme_widget_message_text">test</div>
+        </div>
+        """
+        msgs = list(_parse_messages(html))
+        assert [m.id for m in msgs] == [88888]
+
+
+# ═══════════════════════════════════════════════════════
+# Message — רשומה + פורמט התראה
+# ═══════════════════════════════════════════════════════
+
+class TestMessage:
+    def test_immutable_and_slotted(self):
+        msg = Message(1, "Tel Aviv")
+        with pytest.raises(AttributeError):
+            msg.text = "x"
+        assert not hasattr(msg, "__dict__")
+
+    def test_text_lower_cached(self):
+        msg = Message(1, "Tel Aviv")
+        assert msg.text_lower == "tel aviv"
+
+    def test_invalid_date_is_none(self):
+        msg = Message.from_raw(1, "x", "not-a-date")
+        assert msg.date is None
+
+    def test_filter_accepts_message(self):
+        msg = Message(1, "תושבי תל אביב - ניתן לצאת מהמרחב המוגן")
+        match, _ = matches_filter(msg)
+        assert match is True
+
+    def test_format_alert_with_date(self):
+        msg = Message.from_raw(5, "תל אביב", "2026-02-28T14:30:00+02:00")
+        text = format_alert(msg)
+        assert "תל אביב\n\n🕐 2026-02-28T14:30:00+02:00\n" in text
+        assert text.startswith("🔔 התראת פיקוד העורף")
+
+    def test_format_alert_without_date(self):
+        text = format_alert(Message(5, "תל אביב"))
+        assert "🕐" not in text
 
 
 # ═══════════════════════════════════════════════════════
@@ -159,31 +220,108 @@ class TestDatabase:
         import database
         db_path = tmp_path / "test.db"
         monkeypatch.setattr(database, "DB_PATH", db_path)
-        # מנקה thread-local connection אם קיים
-        if hasattr(database._local, "conn"):
-            del database._local.conn
+        # סוגר connections שנפתחו מול DB קודם
+        database.close_db()
         init_db()
+        yield
+        database.close_db()
 
     def test_mark_and_check_seen(self):
-        mark_seen("123", "test_channel")
-        assert is_seen("123") is True
-        assert is_seen("999") is False
+        mark_seen(123, "test_channel")
+        assert is_seen(123) is True
+        assert is_seen(999) is False
 
     def test_save_and_check_alert(self):
-        save_alert("123", "test_channel", "test content")
-        assert is_alert_sent("123") is True
-        assert is_alert_sent("999") is False
+        save_alert(123, "test_channel", "test content")
+        assert is_alert_sent(123) is True
+        assert is_alert_sent(999) is False
 
     def test_duplicate_mark_seen_no_error(self):
         """INSERT OR IGNORE — לא זורק שגיאה על כפילות."""
-        mark_seen("123", "test_channel")
-        mark_seen("123", "test_channel")
-        assert is_seen("123") is True
+        mark_seen(123, "test_channel")
+        mark_seen(123, "test_channel")
+        assert is_seen(123) is True
 
     def test_cleanup_keeps_recent(self):
-        mark_seen("recent", "ch")
+        mark_seen(1, "ch")
         cleanup_old(days=14)
-        assert is_seen("recent") is True
+        assert is_seen(1) is True
+
+    def test_pool_bounded_across_threads(self):
+        """הרבה threads שונים — מספר ה-connections לא עולה על גודל ה-pool."""
+        import database
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=16) as ex:
+            list(ex.map(lambda i: mark_seen(i, "ch") or is_seen(i), range(500)))
+        assert 1 <= database.open_connections() <= database.DB_POOL_SIZE
+        assert is_seen(499) is True
+
+    def test_close_db_closes_connections(self):
+        import database
+        mark_seen(1, "ch")
+        assert database.open_connections() >= 1
+        database.close_db()
+        assert database.open_connections() == 0
+        # נפתח מחדש לפי דרישה
+        assert is_seen(1) is True
+
+    def test_close_db_counts_checked_out_connections(self):
+        """connection שבשימוש בזמן close_db נספר עד שהוא מוחזר ונסגר."""
+        import database
+        database.close_db()
+        conn = database._pool.acquire()
+        database.close_db()
+        assert database.open_connections() == 1
+        database._pool.release(conn)
+        assert database.open_connections() == 0
+
+    def test_limit_includes_closing_connections(self, monkeypatch):
+        """אחרי close_db, connection שעדיין בשימוש נספר מול ה-limit."""
+        import database
+        pool = database._ConnectionPool(1)
+        monkeypatch.setattr(database, "_ACQUIRE_TIMEOUT", 0.2)
+        conn = pool.acquire()
+        pool.close_all()
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+        assert pool.open_count == 1
+        pool.release(conn)
+        assert pool.open_count == 0
+
+    def test_waiter_woken_when_closing_connection_released(self):
+        """ממתין ל-connection מתעורר כשה-connection שנסגר מוחזר — לא מחכה ל-timeout."""
+        import database
+        import threading
+        import time
+        pool = database._ConnectionPool(1)
+        conn = pool.acquire()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+        waiter.start()
+        time.sleep(0.05)
+        pool.close_all()
+        pool.release(conn)
+        waiter.join(timeout=2)
+        assert not waiter.is_alive()
+        assert got and got[0] is not conn
+        pool.release(got[0])
+        pool.close_all()
+        assert pool.open_count == 0
+
+    def test_legacy_text_column(self, tmp_path, monkeypatch):
+        """DB ישן עם msg_id TEXT — עדיין מזהה מזהים שלמים."""
+        import database
+        import sqlite3
+        db_path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE seen_messages (msg_id TEXT PRIMARY KEY, channel TEXT NOT NULL, seen_at TEXT NOT NULL)")
+        conn.execute("INSERT INTO seen_messages VALUES ('555', 'ch', '2099-01-01')")
+        conn.commit()
+        conn.close()
+        monkeypatch.setattr(database, "DB_PATH", db_path)
+        database.close_db()
+        init_db()
+        assert is_seen(555) is True
 
 
 # ═══════════════════════════════════════════════════════
@@ -196,45 +334,137 @@ class TestIntegration:
         import database
         db_path = tmp_path / "test.db"
         monkeypatch.setattr(database, "DB_PATH", db_path)
-        if hasattr(database._local, "conn"):
-            del database._local.conn
+        database.close_db()
         init_db()
+        yield
+        database.close_db()
 
     def test_full_pipeline(self):
         """HTML → parse → filter → dedup → should alert."""
-        msgs = _parse_messages(_SAMPLE_HTML)
+        msgs = list(_parse_messages(_SAMPLE_HTML))
         assert len(msgs) == 2
 
         alerts = []
         for msg in msgs:
-            if is_seen(msg["id"]):
+            if is_seen(msg.id):
                 continue
-            mark_seen(msg["id"], "test")
-            match, reason = matches_filter(msg["text"])
-            if match and not is_alert_sent(msg["id"]):
+            mark_seen(msg.id, "test")
+            match, reason = matches_filter(msg)
+            if match and not is_alert_sent(msg.id):
                 alerts.append((msg, reason))
-                save_alert(msg["id"], "test", msg["text"])
+                save_alert(msg.id, "test", msg.text)
 
         # רק ההודעה עם "תל אביב" + "ניתן לצאת" עוברת
         assert len(alerts) == 1
-        assert "12345" == alerts[0][0]["id"]
+        assert 12345 == alerts[0][0].id
 
     def test_dedup_prevents_second_alert(self):
         """הודעה שכבר נשלחה לא נשלחת שוב."""
-        msgs = _parse_messages(_SAMPLE_HTML)
+        msgs = list(_parse_messages(_SAMPLE_HTML))
 
         # סבב ראשון
         for msg in msgs:
-            mark_seen(msg["id"], "test")
-            match, reason = matches_filter(msg["text"])
+            mark_seen(msg.id, "test")
+            match, reason = matches_filter(msg)
             if match:
-                save_alert(msg["id"], "test", msg["text"])
+                save_alert(msg.id, "test", msg.text)
 
         # סבב שני — אותן הודעות
         alerts = []
         for msg in msgs:
-            if is_seen(msg["id"]):
+            if is_seen(msg.id):
                 continue  # כבר נראו → מדלגים
             alerts.append(msg)
 
         assert len(alerts) == 0
+
+
+# ═══════════════════════════════════════════════════════
+# פרופיילר — sampling + tracemalloc
+# ═══════════════════════════════════════════════════════
+
+class TestProfiler:
+    def _busy(self):
+        return sum(i * i for i in range(50_000))
+
+    def test_disabled_by_default(self, tmp_path):
+        """בלי toggle — אין thread, אין tracemalloc, אין קבצים."""
+        import tracemalloc
+        from profiler import Profiler
+        p = Profiler(cycles=2, out_dir=tmp_path)
+        p.before_cycle()
+        self._busy()
+        p.after_cycle()
+        assert p.running is False
+        assert tracemalloc.is_tracing() is False
+        assert list(tmp_path.iterdir()) == []
+
+    def test_session_writes_reports(self, tmp_path):
+        """סשן של N סבבים כותב collapsed stacks + דוח הקצאות ונכבה לבד."""
+        import tracemalloc
+        from profiler import Profiler
+        p = Profiler(cycles=2, out_dir=tmp_path)
+        p.request_toggle()
+        for _ in range(2):
+            p.before_cycle()
+            assert p.running is True
+            self._busy()
+            p.after_cycle()
+        assert p.running is False
+        assert tracemalloc.is_tracing() is False
+
+        collapsed = list(tmp_path.glob("profile-*.collapsed"))
+        alloc = list(tmp_path.glob("alloc-*.txt"))
+        assert len(collapsed) == 1 and len(alloc) == 1
+        lines = collapsed[0].read_text(encoding="utf-8").splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert any("tests.py:_busy" in line for line in lines)
+        assert "top allocations" in alloc[0].read_text(encoding="utf-8")
+
+    def test_toggle_stops_early(self, tmp_path):
+        """toggle שני באמצע סשן — עוצר וכותב דוחות מיד."""
+        from profiler import Profiler
+        import time
+        p = Profiler(cycles=100, out_dir=tmp_path)
+        p.request_toggle()
+        p.before_cycle()
+        p.after_cycle()
+        assert p.running is True
+        # ה-sampler ממתין ל-active בין סבבים — העצירה עצמה לא נדגמת
+        time.sleep(0.05)
+        p.request_toggle()
+        p.before_cycle()
+        assert p.running is False
+        reports = list(tmp_path.glob("profile-*.collapsed"))
+        assert len(reports) == 1
+        assert "profiler.py:_finish" not in reports[0].read_text(encoding="utf-8")
+
+    def test_back_to_back_sessions_keep_both_reports(self, tmp_path):
+        """שני סשנים באותה שנייה — שמות קבצים שונים, אין דריסה."""
+        from profiler import Profiler
+        p = Profiler(cycles=1, out_dir=tmp_path)
+        for _ in range(2):
+            p.request_toggle()
+            p.before_cycle()
+            p.after_cycle()
+        assert len(list(tmp_path.glob("profile-*.collapsed"))) == 2
+        assert len(list(tmp_path.glob("alloc-*.txt"))) == 2
+
+    def test_error_does_not_escape(self, tmp_path):
+        """tracemalloc נעצר מבחוץ באמצע סשן — after_cycle לא זורק ומתאפס."""
+        import tracemalloc
+        from profiler import Profiler
+        p = Profiler(cycles=1, out_dir=tmp_path)
+        p.request_toggle()
+        p.before_cycle()
+        tracemalloc.stop()
+        p.after_cycle()
+        assert p.running is False
+        assert tracemalloc.is_tracing() is False
+        # סשן חדש עובד כרגיל אחרי השגיאה
+        p.request_toggle()
+        p.before_cycle()
+        p.after_cycle()
+        assert len(list(tmp_path.glob("profile-*.collapsed"))) == 1